@@ -6,18 +6,25 @@ Entry point for the Streamlit application
 
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv  # Add this import
+from dotenv import load_dotenv
 
 # Add the src directory to Python path
 src_path = Path(__file__).parent / 'src'
 sys.path.append(str(src_path))
 
+@lru_cache(maxsize=None)
+def load_environment():
+    """Load .env once per process; variables already in the environment win"""
+    if not os.getenv('AWS_ACCESS_KEY_ID'):
+        load_dotenv(Path(__file__).parent / '.env', override=False)
+
 def main():
     """Main entry point"""
     try:
         # Load environment variables from .env file
-        load_dotenv('env.example')  # Add this line
+        load_environment()
         
         # Check if required environment variables are set
         required_vars = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY']
@@ -1,33 +1,23 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
+from functools import lru_cache
 import sys
 import os
-import tempfile
-from decimal import Decimal
+import html
+from jinja2 import Template
+from urllib.parse import quote
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from aws_client import aws_client
 from utils.case_utils import CaseManager
-from utils.visualization import *
+from utils.visualization import (
+    build_case_frame, clear_case_frame_cache, create_status_pie_chart, create_document_type_bar_chart
+)
 
 # Helper functions for safe data access
-def convert_decimals(obj):
-    if isinstance(obj, Decimal):
-        return float(obj) if obj % 1 != 0 else int(obj)
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(v) for v in obj]
-    elif isinstance(obj, set):
-        return [convert_decimals(v) for v in obj]
-    else:
-        return obj
-
 def format_timestamp(timestamp):
     if isinstance(timestamp, (int, float)):
         return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
@@ -40,22 +30,182 @@ def format_timestamp(timestamp):
         return str(timestamp)
 
 def safe_get(data, key, default=None):
-    if not isinstance(data, dict):
-        return default
-        
-    keys = key.split('.')
+    return _fast_get(data, _key_path(key), default)
+
+@lru_cache(maxsize=None)
+def _key_path(key):
+    return tuple(key.split('.'))
+
+def _fast_get(data, path, default=None):
+    """safe_get for a pre-split key path, e.g. _fast_get(case, _K_KEY_FINDINGS, [])"""
     current = data
-    
-    for k in keys:
+    for k in path:
         if isinstance(current, dict) and k in current:
             current = current[k]
         else:
             return default
     
-    return convert_decimals(current) if current is not None else default
+    return current if current is not None else default
+
+# Pre-split key paths for the hot render paths
+_K_CASE_ID = ('caseID',)
+_K_PATIENT = ('patientName',)
+_K_DOC_TYPE = ('documentType',)
+_K_UPLOAD_DATE = ('uploadDate',)
+_K_PRIORITY = ('priority',)
+_K_STATUS = ('status',)
+_K_KEY_FINDINGS = ('extractionMetadata', 'keyFindings')
+
+# Initialize case manager once per process, not per session or rerun
+@st.cache_resource(show_spinner=False)
+def _get_case_manager():
+    return CaseManager(aws_client)
+
+case_manager = _get_case_manager()
 
-# Initialize case manager
-case_manager = CaseManager(aws_client)
+# Optional PDF.js viewer (e.g. /app/static/pdfjs/web/viewer.html with static serving enabled)
+PDFJS_VIEWER_URL = os.getenv('PDFJS_VIEWER_URL')
+
+class CasesUnavailableError(Exception):
+    """The case list could not be loaded from DynamoDB"""
+
+# Cached data access - every widget interaction reruns the script, so avoid
+# hitting DynamoDB on each rerun. The case list is a shared resource (not a
+# per-call copy) so status updates can be patched into it. Cached cases are
+# shared by all sessions and never changed in place; updates replace them.
+@st.cache_resource(ttl=60, show_spinner=False)
+def _load_all_cases():
+    # A failed scan raises rather than returning [], since cache_resource would
+    # otherwise show every session an empty case list for the whole TTL
+    try:
+        cases = case_manager.get_all_cases(raise_errors=True)
+    except Exception as e:
+        raise CasesUnavailableError(f"Error fetching cases: {str(e)}") from e
+    # Already converted (and shared) by CaseManager, so safe_get can return values as-is
+    return cases
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_case_metrics(_cases, cases_key):
+    # cases_key is a tuple of (caseID, status, priority) so metrics are only
+    # recomputed when those change; _cases is excluded from hashing
+    return case_manager.get_case_metrics(_cases)
+
+def _case_metrics_key(cases):
+    return tuple((c.get('caseID'), c.get('status'), c.get('priority')) for c in cases)
+
+_TABLE_COLUMNS = ["Case ID", "Member Name", "Document Type", "Received Date", "Priority", "Status"]
+_PAGE_SIZE = 50
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _projected_rows(filters_key, start_keys=None):
+    """One page of filtered dashboard rows as a ready-to-render DataFrame,
+    plus the start keys for the next page (None on the last page)"""
+    status_filter, doc_type_filter, priority_filter = filters_key
+    filters = {
+        'status': list(status_filter),
+        'document_type': list(doc_type_filter),
+        'priority': list(priority_filter)
+    }
+    cases, next_keys = case_manager.get_filtered_cases(
+        filters, limit=_PAGE_SIZE, start_keys=start_keys, fallback_cases=_load_all_cases
+    )
+    df = pd.DataFrame({
+        "Case ID": [_fast_get(case, _K_CASE_ID, 'N/A') for case in cases],
+        "Member Name": [_fast_get(case, _K_PATIENT, 'Unknown') for case in cases],
+        "Document Type": [_fast_get(case, _K_DOC_TYPE, 'N/A') for case in cases],
+        "Received Date": [_fast_get(case, _K_UPLOAD_DATE, '') for case in cases],
+        "Priority": [_fast_get(case, _K_PRIORITY, 'MEDIUM') for case in cases],
+        "Status": [_fast_get(case, _K_STATUS, 'UNKNOWN') for case in cases],
+    }, columns=_TABLE_COLUMNS)
+    
+    # Same parsing as the detail view (format_timestamp keeps each value's own
+    # UTC offset) so both show the same day; done once per distinct date
+    upload_dates = df["Received Date"]
+    display_dates = {d: format_timestamp(d).split(' ')[0] for d in upload_dates.unique() if d}
+    df["Received Date"] = upload_dates.map(display_dates).fillna('N/A')
+    return df, next_keys
+
+# Keyed by the identity of the list it indexes; the entry holds that list so
+# its id can't be reused while the index is alive, and max_entries drops it
+# as soon as a reloaded list is filtered
+@st.cache_resource(ttl=60, max_entries=1, show_spinner=False)
+def _case_filter_index(_cases, cases_id):
+    return _cases, case_manager.build_filter_index(_cases)
+
+# Shared like the case list it maps, so a lookup is a dict access rather than
+# unpickling every case; keyed and pinned the same way as _case_filter_index
+@st.cache_resource(ttl=60, max_entries=1, show_spinner=False)
+def _case_lookup(_cases, cases_id):
+    return _cases, {case.get('caseID'): case for case in _cases}
+
+def _cases_by_id():
+    cases = _load_all_cases()
+    return _case_lookup(cases, id(cases))[1]
+
+def _find_case(case_id):
+    """Look up a case, reloading the case list once if it predates the case"""
+    case = _cases_by_id().get(case_id)
+    if case is None:
+        # Dashboard rows come from a fresher index query than the cached list,
+        # so a newly ingested case can be selected before the list has it
+        _load_all_cases.clear()
+        _case_lookup.clear()
+        case = _cases_by_id().get(case_id)
+    return case
+
+def _filters_key(status_filter, doc_type_filter, priority_filter):
+    return (tuple(sorted(status_filter)), tuple(sorted(doc_type_filter)), tuple(sorted(priority_filter)))
+
+def _page_start_keys(filters_key):
+    """Start keys of the dashboard page being viewed, reset when the filters change"""
+    if st.session_state.get('page_filters_key') != filters_key:
+        st.session_state.page_filters_key = filters_key
+        st.session_state.page_start_keys = None
+    return st.session_state.page_start_keys
+
+def _apply_case_update(updated):
+    """Patch an updated case into the shared case list instead of rescanning the table"""
+    cases = _load_all_cases()
+    for i, case in enumerate(cases):
+        if case.get('caseID') == updated.get('caseID'):
+            # Copy-on-write: other sessions may be reading the cached dict, so
+            # swap in a new one. Its search index is left out and recomputed
+            # by searches, since the updated fields may be searchable.
+            patched = {**case, **updated}
+            patched.pop('_lc', None)
+            cases[i] = patched
+            break
+    else:
+        _load_all_cases.clear()
+    
+    # Derived caches are rebuilt locally from the patched list
+    _case_filter_index.clear()
+    clear_case_frame_cache()
+    _projected_rows.clear()
+    _case_lookup.clear()
+
+class DocumentUnavailableError(Exception):
+    """An S3 call behind a cached document helper failed"""
+
+# Presigned URLs are valid for an hour (get_document_url's default expires_in)
+# and aws_client may already hand out one that is up to 30 minutes old, so keep
+# them for 15 more minutes to never serve an expired link
+@st.cache_data(ttl=900, show_spinner=False)
+def _presigned_url(s3_location: str) -> str:
+    url = aws_client.get_document_url(s3_location)
+    if url is None:
+        # Raised rather than returned: st.cache_data doesn't cache exceptions,
+        # so the next rerun retries instead of hiding the link for the TTL
+        raise DocumentUnavailableError(f"Could not create a link for {s3_location}")
+    return url
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def _document_bytes(s3_location: str) -> bytes:
+    content = aws_client.download_document_bytes(s3_location)
+    if content is None:
+        # Same as _presigned_url: raise so the failure isn't cached
+        raise DocumentUnavailableError(f"Could not download {s3_location}")
+    return content
 
 # Page configuration
 st.set_page_config(
@@ -65,11 +215,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Professional CSS for full-screen case view
-# Professional CSS for table layout
-# Professional CSS with proper document viewer height
-# Professional CSS with compact buttons
-st.markdown("""
+# Professional CSS for the dashboard table and full-screen case view, emitted
+# once per run from main()
+_CSS = """
 <style>
     .main-header {
         font-size: 1.8rem;
@@ -128,30 +276,6 @@ st.markdown("""
         padding: 1rem;
     }
     
-    /* Table Styles - Consistent with case details */
-    .table-header {
-        background-color: #f8f9fa;
-        border-bottom: 2px solid #e9ecef;
-        font-weight: 600;
-        font-size: 0.8rem;
-        color: #495057;
-        padding: 0.75rem;
-        text-align: left;
-    }
-    .table-cell {
-        padding: 0.75rem;
-        font-size: 0.8rem;
-        color: #333;
-        vertical-align: middle;
-    }
-    .status-badge-table, .priority-badge-table {
-        font-size: 0.7rem;
-        padding: 0.2rem 0.5rem;
-        border-radius: 4px;
-        font-weight: 500;
-        display: inline-block;
-    }
-    
     /* Remove extra margins for compact layout */
     .stMarkdown {
         margin-bottom: 0.1rem !important;
@@ -162,22 +286,30 @@ st.markdown("""
         padding-bottom: 1rem;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 def main():
+    st.markdown(_CSS, unsafe_allow_html=True)
+    
     # Initialize session state
-    if 'selected_case' not in st.session_state:
-        st.session_state.selected_case = None
-    if 'action_taken' not in st.session_state:
-        st.session_state.action_taken = False
-
-    # If a case is selected, show full-screen case view without sidebar
-    if st.session_state.selected_case:
-        show_fullscreen_case_view(st.session_state.selected_case)
-        return
+    if 'selected_case_id' not in st.session_state:
+        st.session_state.selected_case_id = None
 
-    # Normal view with sidebar
-    show_dashboard_with_sidebar()
+    try:
+        # If a case is selected, show full-screen case view without sidebar
+        if st.session_state.selected_case_id:
+            case = _find_case(st.session_state.selected_case_id)
+            if case:
+                show_fullscreen_case_view(case)
+                return
+            # Drop the table's row selection too, or it would select the case again
+            st.session_state.selected_case_id = None
+            st.session_state.pop('cases_table', None)
+        
+        # Normal view with sidebar
+        show_dashboard_with_sidebar()
+    except CasesUnavailableError:
+        st.error("Cases could not be loaded, please try again")
 
 def show_fullscreen_case_view(case):
     """Full-screen case view without sidebar"""
@@ -187,7 +319,7 @@ def show_fullscreen_case_view(case):
     
     with col1:
         if st.button("← Back to Dashboard", use_container_width=True):
-            st.session_state.selected_case = None
+            st.session_state.selected_case_id = None
             st.rerun()
     
     with col2:
@@ -198,21 +330,38 @@ def show_fullscreen_case_view(case):
         # Empty column for balance
         pass
     
-    # Action buttons
-    display_action_buttons_compact(case)
-    
-    # Main content - two equal columns
+    # Main content - two equal columns, each its own fragment so an action on
+    # the case doesn't rerun (and reload) the document viewer
     left_col, right_col = st.columns([1, 1], gap="large")
     
     with left_col:
-        st.markdown('<div class="case-details-container">', unsafe_allow_html=True)
-        display_case_details_compact(case)
-        st.markdown('</div>', unsafe_allow_html=True)
+        _case_left_pane()
     
     with right_col:
-        st.markdown('<div class="document-viewer-container">', unsafe_allow_html=True)
-        display_document_viewer_compact(case)
-        st.markdown('</div>', unsafe_allow_html=True)
+        _case_document_pane(case)
+
+@st.fragment
+def _case_left_pane():
+    """Action buttons and case details, rerun on their own after a status change"""
+    # Fragment reruns don't pass through main()'s handler
+    try:
+        case = _cases_by_id().get(st.session_state.selected_case_id)
+        if not case:
+            return
+        display_action_buttons_compact(case)
+    except CasesUnavailableError:
+        st.error("Cases could not be loaded, please try again")
+        return
+    
+    st.markdown('<div class="case-details-container">', unsafe_allow_html=True)
+    display_case_details_compact(case)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def _case_document_pane(case):
+    st.markdown('<div class="document-viewer-container">', unsafe_allow_html=True)
+    display_document_viewer_compact(case)
+    st.markdown('</div>', unsafe_allow_html=True)
 
 def show_dashboard_with_sidebar():
     """Normal dashboard view with sidebar"""
@@ -220,12 +369,6 @@ def show_dashboard_with_sidebar():
     # Header
     st.markdown('<div class="main-header">🏥 Healthcare Case Management</div>', unsafe_allow_html=True)
     
-    # Handle case actions
-    if st.session_state.action_taken:
-        st.session_state.action_taken = False
-        st.session_state.selected_case = None
-        st.rerun()
-
     # Sidebar
     with st.sidebar:
         st.markdown("**Navigation**")
@@ -252,16 +395,13 @@ def show_dashboard_content(status_filter, doc_type_filter, priority_filter):
     """Dashboard content with professional table layout"""
     st.markdown("### 📊 Dashboard Overview")
     
-    dashboard_filters = {
-        'status': ["PENDING_REVIEW"],
-        'document_type': doc_type_filter,
-        'priority': priority_filter
-    }
-    
-    cases = case_manager.get_all_cases()
-    filtered_cases = case_manager.filter_cases(cases, dashboard_filters)
-    all_cases = case_manager.get_all_cases()
-    metrics = case_manager.get_case_metrics(all_cases)
+    filters_key = _filters_key(["PENDING_REVIEW"], doc_type_filter, priority_filter)
+    start_keys = _page_start_keys(filters_key)
+    cases_df, next_keys = _projected_rows(filters_key, start_keys)
+    # Counted from the cached case list (needed for the total anyway), so the
+    # cards always agree with the table after a status update
+    all_cases = _load_all_cases()
+    metrics = _load_case_metrics(all_cases, _case_metrics_key(all_cases))
     
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -279,255 +419,164 @@ def show_dashboard_content(status_filter, doc_type_filter, priority_filter):
     # Pending Cases with professional table
     st.markdown('<div style="font-size: 1.1rem; font-weight: 600; color: #2c3e50; margin-bottom: 1rem;">Pending Cases</div>', unsafe_allow_html=True)
     
-    if not filtered_cases:
+    if cases_df.empty:
         st.info("No pending cases requiring attention")
-        return
-    
-    # Display cases in a professional table format
-    display_cases_table(filtered_cases)
-
-def display_cases_table(cases):
-    """Display cases in a professional table format"""
-    
-    # Table header
-    st.markdown("""
-    <style>
-    .cases-table {
-        width: 100%;
-        border-collapse: collapse;
-    }
-    .table-header {
-        background-color: #f8f9fa;
-        border-bottom: 2px solid #e9ecef;
-        font-weight: 600;
-        font-size: 0.85rem;
-        color: #495057;
-    }
-    .table-row {
-        border-bottom: 1px solid #e9ecef;
-    }
-    .table-row:hover {
-        background-color: #f8f9fa;
-    }
-    .table-cell {
-        padding: 0.75rem;
-        font-size: 0.8rem;
-    }
-    .caseid-link {
-        color: #007bff;
-        text-decoration: none;
-        cursor: pointer;
-        font-weight: 500;
-    }
-    .caseid-link:hover {
-        text-decoration: underline;
-    }
-    .status-badge-table {
-        font-size: 0.7rem;
-        padding: 0.2rem 0.5rem;
-        border-radius: 4px;
-        font-weight: 500;
-    }
-    .priority-badge-table {
-        font-size: 0.7rem;
-        padding: 0.2rem 0.5rem;
-        border-radius: 4px;
-        font-weight: 500;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Create table header
-    col1, col2, col3, col4, col5, col6 = st.columns([1.5, 2, 1.5, 1.5, 1, 1])
-    
-    with col1:
-        st.markdown('<div class="table-header">Case ID</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown('<div class="table-header">Member Name</div>', unsafe_allow_html=True)
-    with col3:
-        st.markdown('<div class="table-header">Document Type</div>', unsafe_allow_html=True)
-    with col4:
-        st.markdown('<div class="table-header">Received Date</div>', unsafe_allow_html=True)
-    with col5:
-        st.markdown('<div class="table-header">Priority</div>', unsafe_allow_html=True)
-    with col6:
-        st.markdown('<div class="table-header">Status</div>', unsafe_allow_html=True)
-    
-    # Display each case as a table row
-    for case in cases:
-        display_case_table_row(case)
-
-def display_case_table_row(case):
-    """Display a single case as a table row"""
-    case_id = safe_get(case, 'caseID', 'N/A')
-    patient_name = safe_get(case, 'patientName', 'Unknown')
-    document_type = safe_get(case, 'documentType', 'N/A')
-    upload_date = safe_get(case, 'uploadDate', '')
-    priority = safe_get(case, 'priority', 'MEDIUM')
-    status = safe_get(case, 'status', 'UNKNOWN')
-    
-    # Format date
-    if upload_date:
-        formatted_date = format_timestamp(upload_date)
-        display_date = formatted_date.split(' ')[0]  # Show only date part
     else:
-        display_date = 'N/A'
+        # Display cases in a professional table format
+        display_cases_table(cases_df)
     
-    # Create columns for the table row
-    col1, col2, col3, col4, col5, col6 = st.columns([1.5, 2, 1.5, 1.5, 1, 1])
+    display_page_navigation(start_keys, next_keys)
+
+def display_page_navigation(start_keys, next_keys):
+    """First/Next page buttons for the pending cases table"""
+    if start_keys is None and next_keys is None:
+        return
     
+    col1, col2, _ = st.columns([1, 1, 4])
     with col1:
-        # Make Case ID clickable
-        if st.button(case_id, key=f"case_{case_id}", use_container_width=True):
-            st.session_state.selected_case = case
+        if start_keys is not None and st.button("⏮ First page", key="page_first"):
+            st.session_state.page_start_keys = None
             st.rerun()
-    
     with col2:
-        st.markdown(f'<div class="table-cell">{patient_name}</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f'<div class="table-cell">{document_type}</div>', unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown(f'<div class="table-cell">{display_date}</div>', unsafe_allow_html=True)
-    
-    with col5:
-        priority_badge_class = f"priority-{priority.lower()}"
-        st.markdown(f'<div class="table-cell"><span class="priority-badge-table {priority_badge_class}">{priority}</span></div>', unsafe_allow_html=True)
-    
-    with col6:
-        status_badge_class = f"status-{status.lower().replace('_', '-')}"
-        st.markdown(f'<div class="table-cell"><span class="status-badge-table {status_badge_class}">{status}</span></div>', unsafe_allow_html=True)
-    
-    # Add subtle separator
-    st.markdown('<hr style="margin: 0.2rem 0; border: none; border-top: 1px solid #f0f0f0;">', unsafe_allow_html=True)
+        if next_keys is not None and st.button("Next page ▶", key="page_next"):
+            st.session_state.page_start_keys = next_keys
+            st.rerun()
+
+def display_cases_table(df):
+    """Display cases as a single selectable table"""
+    # Selecting a row opens the case, replacing one button per row
+    event = st.dataframe(
+        df,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="cases_table",
+        column_config={
+            "Case ID": st.column_config.TextColumn("Case ID", help="Select a row to review the case"),
+            "Member Name": st.column_config.TextColumn("Member Name", width="medium"),
+        }
+    )
+    
+    if event.selection.rows:
+        case_id = df.iloc[event.selection.rows[0]]["Case ID"]
+        st.session_state.selected_case_id = case_id
+        st.rerun()
+
+def _update_status(case, new_status):
+    case_id = safe_get(case, 'caseID', '')
+    updated = case_manager.update_case_status(case_id, new_status)
+    if updated:
+        _apply_case_update(updated)
+        st.rerun(scope="fragment")
 
 def display_action_buttons_compact(case):
     """Compact action buttons with same font size as case info headings"""
-    case_id = safe_get(case, 'caseID', '')
     current_status = safe_get(case, 'status', 'UNKNOWN')
     priority = safe_get(case, 'priority', 'MEDIUM')
+    confidence = safe_get(case, 'confidenceScore', 0) * 100
     
     st.markdown('<div class="action-buttons-compact">', unsafe_allow_html=True)
     
-    # Use more columns for better spacing with smaller buttons
-    col1, col2, col3, col4, col5, col6 = st.columns([1.2, 1, 1, 1, 1, 1.2])
+    col1, col2, col3, col4 = st.columns([2.4, 1, 1, 1])
     
     with col1:
+        # Status, priority and confidence share one element
         status_badge_class = f"status-{current_status.lower().replace('_', '-')}"
-        st.markdown(f'<span class="status-badge {status_badge_class}">{current_status}</span>', unsafe_allow_html=True)
+        priority_badge_class = f"priority-{priority.lower()}"
+        st.markdown(
+            f'<span class="status-badge {status_badge_class}">{current_status}</span> '
+            f'<span class="status-badge {priority_badge_class}">{priority}</span> '
+            f'<span style="font-size: 0.8rem; margin-left: 0.4rem;"><span style="font-weight: 600; color: #495057;">Confidence:</span> <span style="color: #333;">{confidence:.1f}%</span></span>',
+            unsafe_allow_html=True
+        )
     
     with col2:
         if st.button("✅ Approve", use_container_width=True, type="primary", key="btn_approve"):
-            if case_manager.update_case_status(case_id, 'APPROVED'):
-                st.session_state.action_taken = True
-                st.rerun()
+            _update_status(case, 'APPROVED')
     
     with col3:
         if st.button("❌ Deny", use_container_width=True, key="btn_deny"):
-            if case_manager.update_case_status(case_id, 'DENIED'):
-                st.session_state.action_taken = True
-                st.rerun()
+            _update_status(case, 'DENIED')
     
     with col4:
         if st.button("⏸️ Hold", use_container_width=True, key="btn_hold"):
-            if case_manager.update_case_status(case_id, 'IN_PROGRESS'):
-                st.session_state.action_taken = True
-                st.rerun()
-    
-    with col5:
-        priority_badge_class = f"priority-{priority.lower()}"
-        st.markdown(f'<span class="status-badge {priority_badge_class}">{priority}</span>', unsafe_allow_html=True)
-    
-    with col6:
-        confidence = safe_get(case, 'confidenceScore', 0) * 100
-        st.markdown(f'<div style="font-size: 0.8rem;"><span style="font-weight: 600; color: #495057;">Confidence:</span> <span style="color: #333;">{confidence:.1f}%</span></div>', unsafe_allow_html=True)
+            _update_status(case, 'IN_PROGRESS')
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+# Case details pane, compiled once at import. Lines are joined so the output
+# is a single markdown HTML block; autoescaping keeps extracted document text
+# from being interpreted as HTML.
+_CASE_DETAILS_TPL = Template("".join(line.strip() for line in """
+{%- macro section(title, first=False) -%}
+<div style="font-size: 0.9rem; font-weight: 600; color: #495057; {{ 'margin-bottom: 0.5rem;' if first else 'margin: 0.8rem 0 0.5rem 0;' }} border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">{{ title }}</div>
+{%- endmacro -%}
+{%- macro row(label, value, margin_bottom='0.3rem') -%}
+<div style="font-size: 0.8rem; margin-bottom: {{ margin_bottom }};"><span style="font-weight: 600; color: #495057;">{{ label }}:</span> <span style="color: #333;">{{ value }}</span></div>
+{%- endmacro -%}
+{%- macro label(text) -%}
+<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">{{ text }}:</span></div>
+{%- endmacro -%}
+{%- set grid = '<div style="display: grid; grid-template-columns: 1fr 1fr; column-gap: 1rem;">' -%}
+{{ section('📋 Case Information', first=True) }}
+{{- grid|safe }}<div>{{ row('Case ID', case_id) }}{{ row('Document Type', document_type) }}</div>
+<div>{{ row('File Name', file_name) }}{% if upload_date %}{{ row('Upload Date', upload_date) }}{% endif %}</div></div>
+{{- section('👤 Patient Information') }}
+{{- grid|safe }}<div>{{ row('Patient Name', patient_name) }}{{ row('Date of Birth', patient_dob) }}{{ row('Member ID', member_id) }}</div>
+<div>{{ row('Insurance Plan', insurance_plan) }}{{ row('Policy Number', policy_number) }}</div></div>
+{{- section('🏥 Clinical Information') }}
+{{- grid|safe }}<div>{{ row('Referring Provider', referring_provider) }}{{ row('Provider NPI', provider_npi) }}</div>
+<div>{{ row('Facility', facility) }}</div></div>
+{%- if cpt_codes or icd_codes %}
+{{- section('📋 Medical Codes') }}
+{{- grid|safe }}<div>{% if cpt_codes %}{{ row('CPT Codes', cpt_codes|join(', ')) }}{% endif %}</div>
+<div>{% if icd_codes %}{{ row('ICD-10 Codes', icd_codes|join(', ')) }}{% endif %}</div></div>
+{%- endif %}
+{%- if diagnosis %}
+{{- section('🩺 Diagnosis') }}{{ row('Description', diagnosis) }}
+{%- endif %}
+{{- section('🔍 AI Analysis') }}{{ row('Confidence Score', '%.1f%%' % confidence, margin_bottom='0.5rem') }}
+{%- if summary %}
+{{- label('Summary') }}<div style="font-size: 0.8rem; color: #333; line-height: 1.4; padding: 0.5rem; background: #f8f9fa; border-radius: 4px; border-left: 3px solid #007bff;">{{ summary }}</div>
+{%- endif %}
+{%- if key_findings %}
+{{- label('Key Findings') }}
+{%- for finding in key_findings %}<div style="font-size: 0.8rem; color: #333; margin: 0.1rem 0 0.1rem 0.5rem;">• {{ finding }}</div>{% endfor %}
+{%- endif %}
+""".splitlines()), autoescape=True)
+
 def display_case_details_compact(case):
-    """Compact case details using dashboard table styling"""
-    
-    # Case Information
-    st.markdown('<div style="font-size: 0.9rem; font-weight: 600; color: #495057; margin-bottom: 0.5rem; border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">📋 Case Information</div>', unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Case ID:</span> <span style="color: #333;">{safe_get(case, "caseID", "N/A")}</span></div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Document Type:</span> <span style="color: #333;">{safe_get(case, "documentType", "N/A")}</span></div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">File Name:</span> <span style="color: #333;">{safe_get(case, "fileName", "N/A")}</span></div>', unsafe_allow_html=True)
-        upload_date = safe_get(case, 'uploadDate')
-        if upload_date:
-            formatted_date = format_timestamp(upload_date)
-            st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Upload Date:</span> <span style="color: #333;">{formatted_date}</span></div>', unsafe_allow_html=True)
-    
-    # Patient Information
-    st.markdown('<div style="font-size: 0.9rem; font-weight: 600; color: #495057; margin: 0.8rem 0 0.5rem 0; border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">👤 Patient Information</div>', unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Patient Name:</span> <span style="color: #333;">{safe_get(case, "patientName", "Not specified")}</span></div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Date of Birth:</span> <span style="color: #333;">{safe_get(case, "patientDOB", "Not specified")}</span></div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Member ID:</span> <span style="color: #333;">{safe_get(case, "memberId", "Not specified")}</span></div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Insurance Plan:</span> <span style="color: #333;">{safe_get(case, "insurancePlan", "Not specified")}</span></div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Policy Number:</span> <span style="color: #333;">{safe_get(case, "policyNumber", "Not specified")}</span></div>', unsafe_allow_html=True)
-    
-    # Clinical Information
-    st.markdown('<div style="font-size: 0.9rem; font-weight: 600; color: #495057; margin: 0.8rem 0 0.5rem 0; border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">🏥 Clinical Information</div>', unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Referring Provider:</span> <span style="color: #333;">{safe_get(case, "referringProvider", "Not specified")}</span></div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Provider NPI:</span> <span style="color: #333;">{safe_get(case, "providerNPI", "Not specified")}</span></div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Facility:</span> <span style="color: #333;">{safe_get(case, "facility", "Not specified")}</span></div>', unsafe_allow_html=True)
-    
-    # Medical Codes
-    cpt_codes = safe_get(case, 'cptCodes', [])
-    icd_codes = safe_get(case, 'icd10Codes', [])
-    if cpt_codes or icd_codes:
-        st.markdown('<div style="font-size: 0.9rem; font-weight: 600; color: #495057; margin: 0.8rem 0 0.5rem 0; border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">📋 Medical Codes</div>', unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if cpt_codes:
-                codes_text = ", ".join(cpt_codes)
-                st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">CPT Codes:</span> <span style="color: #333;">{codes_text}</span></div>', unsafe_allow_html=True)
-        
-        with col2:
-            if icd_codes:
-                codes_text = ", ".join(icd_codes)
-                st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">ICD-10 Codes:</span> <span style="color: #333;">{codes_text}</span></div>', unsafe_allow_html=True)
-    
-    # Diagnosis
-    diagnosis = safe_get(case, 'diagnosisDescription', '')
-    if diagnosis:
-        st.markdown('<div style="font-size: 0.9rem; font-weight: 600; color: #495057; margin: 0.8rem 0 0.5rem 0; border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">🩺 Diagnosis</div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Description:</span> <span style="color: #333;">{diagnosis}</span></div>', unsafe_allow_html=True)
-    
-    # AI Analysis
-    st.markdown('<div style="font-size: 0.9rem; font-weight: 600; color: #495057; margin: 0.8rem 0 0.5rem 0; border-bottom: 1px solid #e9ecef; padding-bottom: 0.3rem;">🔍 AI Analysis</div>', unsafe_allow_html=True)
-    
-    confidence = safe_get(case, 'confidenceScore', 0) * 100
-    st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.5rem;"><span style="font-weight: 600; color: #495057;">Confidence Score:</span> <span style="color: #333;">{confidence:.1f}%</span></div>', unsafe_allow_html=True)
-    
-    summary = safe_get(case, 'caseSummary', '')
-    if summary:
-        st.markdown('<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Summary:</span></div>', unsafe_allow_html=True)
-        st.markdown(f'<div style="font-size: 0.8rem; color: #333; line-height: 1.4; padding: 0.5rem; background: #f8f9fa; border-radius: 4px; border-left: 3px solid #007bff;">{summary}</div>', unsafe_allow_html=True)
-    
-    # Key findings
-    extraction_metadata = safe_get(case, 'extractionMetadata', {})
-    key_findings = safe_get(extraction_metadata, 'keyFindings', [])
-    if key_findings:
-        st.markdown('<div style="font-size: 0.8rem; margin-bottom: 0.3rem;"><span style="font-weight: 600; color: #495057;">Key Findings:</span></div>', unsafe_allow_html=True)
-        for finding in key_findings:
-            st.markdown(f'<div style="font-size: 0.8rem; color: #333; margin: 0.1rem 0 0.1rem 0.5rem;">• {finding}</div>', unsafe_allow_html=True)
+    """Compact case details, rendered as a single HTML element"""
+    upload_date = safe_get(case, 'uploadDate')
+    details_html = _CASE_DETAILS_TPL.render(
+        case_id=safe_get(case, 'caseID', 'N/A'),
+        document_type=safe_get(case, 'documentType', 'N/A'),
+        file_name=safe_get(case, 'fileName', 'N/A'),
+        upload_date=format_timestamp(upload_date) if upload_date else None,
+        patient_name=safe_get(case, 'patientName', 'Not specified'),
+        patient_dob=safe_get(case, 'patientDOB', 'Not specified'),
+        member_id=safe_get(case, 'memberId', 'Not specified'),
+        insurance_plan=safe_get(case, 'insurancePlan', 'Not specified'),
+        policy_number=safe_get(case, 'policyNumber', 'Not specified'),
+        referring_provider=safe_get(case, 'referringProvider', 'Not specified'),
+        provider_npi=safe_get(case, 'providerNPI', 'Not specified'),
+        facility=safe_get(case, 'facility', 'Not specified'),
+        cpt_codes=safe_get(case, 'cptCodes', []),
+        icd_codes=safe_get(case, 'icd10Codes', []),
+        diagnosis=safe_get(case, 'diagnosisDescription', ''),
+        confidence=safe_get(case, 'confidenceScore', 0) * 100,
+        summary=safe_get(case, 'caseSummary', ''),
+        key_findings=_fast_get(case, _K_KEY_FINDINGS, [])
+    )
+    st.markdown(details_html, unsafe_allow_html=True)
+
+def _pdf_viewer_url(document_url):
+    """Route PDFs through PDF.js when a viewer is configured so pages render
+    as byte ranges arrive instead of after the whole file downloads"""
+    if not PDFJS_VIEWER_URL:
+        return document_url
+    return f"{PDFJS_VIEWER_URL}?file={quote(document_url, safe='')}"
 
 def display_document_viewer_compact(case):
     """Document viewer using full container height for PDF display"""
@@ -538,35 +587,52 @@ def display_document_viewer_compact(case):
         return
     
     try:
-        document_url = aws_client.get_document_url(s3_location)
+        document_url = _presigned_url(s3_location)
+    except DocumentUnavailableError:
+        st.warning("Document is temporarily unavailable, please try again")
+        return
+    
+    try:
         file_extension = s3_location.split('.')[-1].lower()
+        file_name = safe_get(case, 'fileName', 'document')
+        
+        # Text documents are downloaded anyway to preview them
+        content = None
+        if file_extension in ['txt', 'text']:
+            try:
+                content = _document_bytes(s3_location)
+            except DocumentUnavailableError:
+                pass
         
         # Very compact file info at the top
         col1, col2 = st.columns([1, 1])
         with col1:
             st.markdown(f'<div style="font-size: 0.8rem; margin-bottom: 0.5rem;"><span style="font-weight: 600; color: #495057;">File Type:</span> <span style="color: #333;">{file_extension.upper()}</span></div>', unsafe_allow_html=True)
         with col2:
-            st.download_button(
-                label="📥 Download",
-                data=document_url,
-                file_name=safe_get(case, 'fileName', 'document'),
-                mime="application/octet-stream",
-                use_container_width=True
-            )
+            if content is not None:
+                st.download_button(
+                    label="📥 Download",
+                    data=content,
+                    file_name=file_name,
+                    mime="text/plain",
+                    use_container_width=True
+                )
+            else:
+                # Let the browser fetch straight from S3 instead of going through the app
+                st.markdown(f'<a href="{html.escape(document_url, quote=True)}" download="{html.escape(file_name, quote=True)}" target="_blank" class="compact-button">📥 Download</a>', unsafe_allow_html=True)
         
         # Document preview - USE FULL CONTAINER HEIGHT
         if file_extension in ['pdf']:
             # Use almost the entire container height for PDF (700px for 800px container)
-            st.markdown(f'<iframe src="{document_url}" width="100%" height="700px" style="border: 1px solid #e0e0e0; border-radius: 4px;"></iframe>', unsafe_allow_html=True)
+            st.markdown(f'<iframe src="{html.escape(_pdf_viewer_url(document_url), quote=True)}" width="100%" height="700px" style="border: 1px solid #e0e0e0; border-radius: 4px;"></iframe>', unsafe_allow_html=True)
         elif file_extension in ['jpg', 'jpeg', 'png', 'gif']:
             st.image(document_url, use_column_width=True)
         elif file_extension in ['txt', 'text']:
-            local_file = aws_client.download_document(s3_location)
-            if local_file:
-                with open(local_file, 'r') as f:
-                    content = f.read()
+            if content is not None:
                 # Full height for text
-                st.text_area("", content, height=650, label_visibility="collapsed")
+                st.text_area("", content.decode('utf-8', errors='replace'), height=650, label_visibility="collapsed")
+            else:
+                st.warning("Preview is temporarily unavailable, please try again")
         else:
             st.markdown(f"[Download Document]({document_url})")
         
@@ -588,7 +654,7 @@ def display_dashboard_case_card(case):
         
         with col2:
             if st.button("Review Case", key=f"view_{safe_get(case, 'caseID')}", use_container_width=True):
-                st.session_state.selected_case = case
+                st.session_state.selected_case_id = safe_get(case, 'caseID')
                 st.rerun()
             
             status_badge_class = f"status-{status.lower().replace('_', '-')}"
@@ -598,16 +664,24 @@ def display_dashboard_case_card(case):
 
 def show_case_list(status_filter, doc_type_filter, priority_filter):
     st.markdown("### 📋 Case List")
-    cases = case_manager.get_all_cases()
+    cases = _load_all_cases()
     filters = {'status': status_filter, 'document_type': doc_type_filter, 'priority': priority_filter}
-    filtered_cases = case_manager.filter_cases(cases, filters)
+    _, index = _case_filter_index(cases, id(cases))
+    filtered_cases = case_manager.filter_cases(cases, filters, index=index)
     st.write(f"Showing {len(filtered_cases)} cases")
     for case in filtered_cases:
         display_dashboard_case_card(case)
 
 def show_analytics():
     st.markdown("### 📈 Analytics")
-    st.info("Analytics dashboard coming soon")
+    
+    # One frame feeds both charts instead of walking the cases per chart
+    cases_df = build_case_frame(_load_all_cases())
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(create_status_pie_chart(cases_df), use_container_width=True)
+    with col2:
+        st.plotly_chart(create_document_type_bar_chart(cases_df), use_container_width=True)
 
 def show_settings():
     st.markdown("### ⚙️ Settings")
@@ -1,57 +1,104 @@
-import boto3
 import os
+import re
+import time
 import logging
 import tempfile
-from botocore.exceptions import ClientError
+import threading
 import json
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# s3://bucket-name/key/path (the s3:// prefix is optional). Bucket names can't
+# contain ':', which keeps "s3://bucket" from parsing as bucket "s3:"
+_S3_URI = re.compile(r'(?:s3://)?([^/:]+)/(.+)', re.DOTALL)
+
+@lru_cache(maxsize=4096)
+def _presign(s3_client, bucket: str, key: str, expires_bucket: int, expires_in: int) -> str:
+    """Presigned GET URL; expires_bucket only partitions the cache so a signature
+    is reused for half its lifetime. Failures raise and are not cached."""
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=expires_in
+    )
+
+@lru_cache(maxsize=None)
+def _transfer_config():
+    """Large documents are fetched as concurrent 8 MB ranged GETs; the client
+    connection pool is sized above max_concurrency"""
+    from boto3.s3.transfer import TransferConfig
+    return TransferConfig(
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=8 * 1024 * 1024,
+        max_concurrency=16,
+        use_threads=True
+    )
+
 class AWSClient:
     def __init__(self):
         self.region = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
         self._clients = {}
+        # Size the connection pool for the threaded scans and downloads so
+        # concurrent requests reuse warm connections instead of queueing
+        self._cfg_options = dict(
+            max_pool_connections=64,
+            tcp_keepalive=True,
+            retries={'max_attempts': 5, 'mode': 'adaptive'}
+        )
+        self._lock = threading.Lock()
+        self._tmpdir = tempfile.gettempdir()
     
     def get_dynamodb_resource(self):
         """Get DynamoDB resource"""
-        if 'dynamodb' not in self._clients:
-            self._clients['dynamodb'] = boto3.resource('dynamodb', region_name=self.region)
-        return self._clients['dynamodb']
+        # boto3 is imported on first use so importing this module stays cheap
+        import boto3
+        return self._get_client('dynamodb', boto3.resource)
     
     def get_s3_client(self):
         """Get S3 client"""
-        if 's3' not in self._clients:
-            self._clients['s3'] = boto3.client('s3', region_name=self.region)
-        return self._clients['s3']
+        import boto3
+        return self._get_client('s3', boto3.client)
+    
+    def _get_client(self, service, factory):
+        """Create a boto3 client/resource once and share it across threads"""
+        client = self._clients.get(service)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service)
+                if client is None:
+                    from botocore.client import Config
+                    client = self._clients[service] = factory(service, region_name=self.region,
+                                                              config=Config(**self._cfg_options))
+        return client
     
     def get_table(self, table_name):
         """Get DynamoDB table"""
-        try:
+        # No DescribeTable probe: a missing table raises ClientError from the
+        # first real scan/query/update on it
+        table = self._clients.get(('table', table_name))
+        if table is None:
             dynamodb = self.get_dynamodb_resource()
-            table = dynamodb.Table(table_name)
-            # Verify table exists
-            table.table_status
-            return table
-        except ClientError as e:
-            logger.error(f"Error accessing table {table_name}: {str(e)}")
-            raise e
+            with self._lock:
+                table = self._clients.setdefault(('table', table_name), dynamodb.Table(table_name))
+        return table
     
     def download_document(self, s3_location: str) -> str:
         """Download document from S3 and return local file path"""
         try:
-            # Parse S3 location (format: s3://bucket-name/key/path)
-            if s3_location.startswith('s3://'):
-                s3_location = s3_location[5:]
-            
-            bucket, key = s3_location.split('/', 1)
+            bucket, key = self._parse_s3(s3_location)
             
-            # Create temporary file
-            temp_dir = tempfile.gettempdir()
-            local_filename = os.path.join(temp_dir, key.split('/')[-1])
+            # Create a unique temporary file so keys sharing a basename don't
+            # overwrite each other; the extension is kept for file type checks
+            local_filename = self._temp_path(key.split('/')[-1])
             
             # Download file
             s3_client = self.get_s3_client()
-            s3_client.download_file(bucket, key, local_filename)
+            try:
+                s3_client.download_file(bucket, key, local_filename, Config=_transfer_config())
+            except Exception:
+                os.remove(local_filename)
+                raise
             
             logger.info(f"Downloaded document to: {local_filename}")
             return local_filename
@@ -60,21 +107,88 @@ class AWSClient:
             logger.error(f"Error downloading document {s3_location}: {str(e)}")
             return None
     
-    def get_document_url(self, s3_location: str, expires_in=3600) -> str:
-        """Generate presigned URL for S3 document"""
+    def download_document_bytes(self, s3_location: str) -> bytes:
+        """Download document from S3 straight into memory, skipping the temp file"""
+        try:
+            bucket, key = self._parse_s3(s3_location)
+            
+            # A single GetObject: in-memory documents are small previews, and
+            # download_fileobj would add a HeadObject round trip before the GET
+            s3_client = self.get_s3_client()
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            return response['Body'].read()
+            
+        except Exception as e:
+            logger.error(f"Error downloading document {s3_location}: {str(e)}")
+            return None
+    
+    def upload_document(self, local_path: str, s3_location: str) -> bool:
+        """Upload document to S3, linearizing PDFs for progressive display"""
         try:
-            if s3_location.startswith('s3://'):
-                s3_location = s3_location[5:]
+            bucket, key = self._parse_s3(s3_location)
             
-            bucket, key = s3_location.split('/', 1)
+            upload_path = local_path
+            if local_path.lower().endswith('.pdf'):
+                upload_path = self._linearize_pdf(local_path)
             
             s3_client = self.get_s3_client()
-            url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': bucket, 'Key': key},
-                ExpiresIn=expires_in
-            )
-            return url
+            try:
+                s3_client.upload_file(upload_path, bucket, key)
+            finally:
+                if upload_path != local_path:
+                    os.remove(upload_path)
+            
+            logger.info(f"Uploaded document to: s3://{bucket}/{key}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error uploading document {s3_location}: {str(e)}")
+            return False
+    
+    def _linearize_pdf(self, local_path: str) -> str:
+        """Rewrite a PDF as linearized (Fast Web View) so viewers can show the
+        first page from a ranged GET before the rest of the file arrives.
+        pikepdf is optional; without it the original path is returned."""
+        try:
+            import pikepdf
+        except ImportError:
+            logger.info("pikepdf is not installed, uploading PDF without linearizing")
+            return local_path
+        
+        linearized_path = self._temp_path('linearized_' + os.path.basename(local_path))
+        try:
+            with pikepdf.open(local_path) as pdf:
+                pdf.save(linearized_path, linearize=True)
+        except Exception:
+            os.remove(linearized_path)
+            raise
+        return linearized_path
+    
+    @staticmethod
+    def _parse_s3(s3_location: str):
+        """Split an S3 URI into (bucket, key)"""
+        match = _S3_URI.fullmatch(s3_location)
+        if not match:
+            raise ValueError(f"Invalid S3 location: {s3_location}")
+        return match.groups()
+    
+    def _temp_path(self, filename: str) -> str:
+        """Create an empty, uniquely named file in the temp dir and return its path"""
+        stem, extension = os.path.splitext(filename)
+        fd, path = tempfile.mkstemp(prefix=stem + '_', suffix=extension, dir=self._tmpdir)
+        os.close(fd)
+        return path
+    
+    def get_document_url(self, s3_location: str, expires_in=3600) -> str:
+        """Generate presigned URL for S3 document.
+        
+        URLs are reused for up to half of expires_in, so a returned URL is
+        valid for at least expires_in / 2 more seconds.
+        """
+        try:
+            bucket, key = self._parse_s3(s3_location)
+            expires_bucket = int(time.time() // max(expires_in // 2, 1))
+            return _presign(self.get_s3_client(), bucket, key, expires_bucket, expires_in)
         except Exception as e:
             logger.error(f"Error generating presigned URL: {str(e)}")
             return None
@@ -1,58 +1,247 @@
-import pandas as pd
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import logging
 from decimal import Decimal
-import json
 
 logger = logging.getLogger(__name__)
 
+# Shared by the DynamoDB scan/query fan-out; sized to the boto3 connection pool
+_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix='dynamodb')
+
+# Attributes needed to list and search cases (dashboard rows, case cards)
+LISTING_ATTRIBUTES = ('caseID', 'status', 'priority', 'documentType', 'patientName', 'fileName',
+                      'uploadDate', 'caseSummary', 'diagnosisDescription')
+
+# Fields matched by the free-text search, most likely hit first; their
+# lowercased values are stored once per case under _lc
+SEARCH_FIELDS = ('patientName', 'caseSummary', 'fileName', 'documentType', 'diagnosisDescription')
+
+# filters key -> case attribute (pushed down to DynamoDB as an IN condition)
+_FILTER_ATTRIBUTES = (('status', 'status'), ('document_type', 'documentType'), ('priority', 'priority'))
+
+# Container type -> copy constructor, and how to walk the copy, for _convert_decimals
+_COPY_CONTAINER = {dict: dict, list: list, set: list}
+_ITEMS = {dict: dict.items, list: enumerate}
+
 class CaseManager:
     def __init__(self, aws_client):
         self.aws_client = aws_client
         self.table_name = 'HealthCareCases'
+        self.scan_segments = 8
+        # GSI keyed on status with an ALL projection (aws.status_index in config.yaml)
+        self.status_index = 'status-index'
+        # caseID -> (raw item, converted item) from the last full scan
+        self._converted: Dict[str, tuple] = {}
     
-    def get_all_cases(self) -> List[Dict[str, Any]]:
-        """Get all cases from DynamoDB and convert Decimal to float/int"""
+    def get_all_cases(self, filters: Optional[Dict] = None, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """Get all cases from DynamoDB and convert Decimal to float/int.
+        
+        With filters, non-matching cases are dropped by DynamoDB and only the
+        LISTING_ATTRIBUTES of each case are returned. Errors are logged and give
+        an empty list unless raise_errors is set, for callers that cache the result.
+        """
         try:
-            table = self.aws_client.get_table(self.table_name)
-            response = table.scan()
-            cases = response.get('Items', [])
+            scan_kwargs = {}
+            if filters:
+                filter_expression = self._build_filter_expr(filters)
+                if filter_expression is not None:
+                    scan_kwargs['FilterExpression'] = filter_expression
+                names = {f'#a{i}': attribute for i, attribute in enumerate(LISTING_ATTRIBUTES)}
+                scan_kwargs['ProjectionExpression'] = ', '.join(names)
+                scan_kwargs['ExpressionAttributeNames'] = names
+            
+            cases = self._parallel_scan(**scan_kwargs)
             
-            # Convert Decimal objects to native Python types
-            converted_cases = []
-            for case in cases:
-                converted_case = self._convert_decimals(case)
-                converted_cases.append(converted_case)
+            # Convert Decimal objects to native Python types, reusing the
+            # previous conversion of unchanged items on full scans
+            if filters:
+                converted_cases = [self._index_case(self._convert_decimals(case)) for case in cases]
+            else:
+                converted_cases = self._convert_cases(cases)
+            
+            if filters and filters.get('search_term'):
+                converted_cases = self.filter_cases(converted_cases, {'search_term': filters['search_term']})
             
             return converted_cases
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error fetching cases: {str(e)}")
             return []
     
+    def _convert_cases(self, cases: List[Dict]) -> List[Dict[str, Any]]:
+        """Convert scanned items, skipping items identical to the last scan.
+        
+        Items carry no version attribute, so an item counts as unchanged when it
+        compares equal to the raw item seen last time. Converted items are shared
+        between calls and should be treated as read-only.
+        """
+        previous = self._converted
+        converted_by_id = {}
+        converted_cases = []
+        for case in cases:
+            case_id = case.get('caseID')
+            cached = previous.get(case_id)
+            if cached is not None and cached[0] == case:
+                converted = cached[1]
+            else:
+                # The raw item must stay intact for the next comparison, so
+                # convert into a copy rather than in place
+                converted = self._index_case(self._convert_decimals(case))
+            if case_id is not None:
+                converted_by_id[case_id] = (case, converted)
+            converted_cases.append(converted)
+        
+        # Rebuilt on every full scan so deleted cases drop out
+        self._converted = converted_by_id
+        return converted_cases
+    
+    def _build_filter_expr(self, filters: Dict, exclude: tuple = ()):
+        """AND together an IN condition per non-empty filter, or None if there are none"""
+        from boto3.dynamodb.conditions import Attr
+        
+        filter_expression = None
+        for filter_key, attribute in _FILTER_ATTRIBUTES:
+            if filters.get(filter_key) and attribute not in exclude:
+                condition = Attr(attribute).is_in(list(filters[filter_key]))
+                filter_expression = condition if filter_expression is None else filter_expression & condition
+        return filter_expression
+    
+    def _parallel_scan(self, total_segments: Optional[int] = None, **scan_kwargs) -> List[Dict[str, Any]]:
+        """Scan the table segments concurrently so the round trips overlap"""
+        total_segments = total_segments or self.scan_segments
+        table = self.aws_client.get_table(self.table_name)
+        futures = [_executor.submit(self._scan_segment, table, segment, total_segments, scan_kwargs)
+                   for segment in range(total_segments)]
+        return [item for future in futures for item in future.result()]
+    
+    def _scan_segment(self, table, segment: int, total_segments: int, scan_kwargs: Dict) -> List[Dict[str, Any]]:
+        """Scan one segment of the table, following LastEvaluatedKey pages"""
+        scan_kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments, ConsistentRead=False)
+        items = []
+        while True:
+            response = table.scan(**scan_kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    def get_filtered_cases(self, filters: Dict, limit: int = 50, start_keys: Optional[Dict] = None,
+                           fallback_cases: Optional[Callable[[], List[Dict]]] = None
+                           ) -> Tuple[List[Dict], Optional[Dict]]:
+        """Get one page of cases matching filters using the status GSI.
+        
+        Returns the cases and a {status: LastEvaluatedKey} dict to pass back as
+        start_keys for the next page (None when there are no more pages). If the
+        query fails, falls back to filtering the list returned by calling
+        fallback_cases (or to a filtered scan when it is not given).
+        """
+        statuses = filters.get('status') or []
+        if start_keys is not None:
+            # Statuses that ran out of pages are not queried again
+            statuses = [s for s in statuses if s in start_keys]
+        
+        # status is the index key, so it is matched by the key condition instead
+        filter_expression = self._build_filter_expr(filters, exclude=('status',))
+        
+        try:
+            if not statuses:
+                raise ValueError('status filter is required to query the status index')
+            
+            from boto3.dynamodb.conditions import Key
+            
+            table = self.aws_client.get_table(self.table_name)
+            
+            def query_status(status):
+                query_kwargs = {
+                    'IndexName': self.status_index,
+                    'KeyConditionExpression': Key('status').eq(status)
+                }
+                if filter_expression is not None:
+                    query_kwargs['FilterExpression'] = filter_expression
+                if start_keys and start_keys.get(status):
+                    query_kwargs['ExclusiveStartKey'] = start_keys[status]
+                
+                # Limit caps items read before FilterExpression drops any, so
+                # keep reading until the page is full or the index runs out
+                items = []
+                while True:
+                    query_kwargs['Limit'] = limit - len(items)
+                    response = table.query(**query_kwargs)
+                    items.extend(response.get('Items', []))
+                    last_key = response.get('LastEvaluatedKey')
+                    if last_key is None or len(items) >= limit:
+                        return items, last_key
+                    query_kwargs['ExclusiveStartKey'] = last_key
+            
+            # Query each status partition concurrently and merge the pages
+            pages = dict(zip(statuses, _executor.map(query_status, statuses)))
+            
+            cases = [self._index_case(self._convert_decimals(item)) for items, _ in pages.values() for item in items]
+            next_keys = {status: last_key for status, (_, last_key) in pages.items() if last_key is not None}
+            
+            if filters.get('search_term'):
+                cases = self.filter_cases(cases, {'search_term': filters['search_term']})
+            
+            return cases, next_keys or None
+        except Exception as e:
+            logger.warning(f"Status index query failed, filtering all cases instead: {str(e)}")
+            if fallback_cases is None:
+                return self.get_all_cases(filters), None
+            return self.filter_cases(fallback_cases(), filters), None
+    
+    def _index_case(self, case: Dict) -> Dict:
+        """Store the lowercased search fields on the case so searches skip str().lower()"""
+        case['_lc'] = {field: str(case.get(field, '')).lower() for field in SEARCH_FIELDS}
+        return case
+    
     def _convert_decimals(self, obj):
-        """Recursively convert Decimal objects to float or int"""
-        if isinstance(obj, Decimal):
+        """Convert Decimals to int/float and sets to lists.
+        
+        Dicts and lists are copied in the same walk, so obj is left untouched
+        (_convert_cases compares raw items against the next scan).
+        """
+        kind = type(obj)
+        if kind is Decimal:
             return float(obj) if obj % 1 != 0 else int(obj)
-        elif isinstance(obj, dict):
-            return {k: self._convert_decimals(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_decimals(v) for v in obj]
-        else:
+        if kind not in _COPY_CONTAINER:
             return obj
+        
+        # Explicit stack instead of recursion: no call per node, no depth limit
+        root = _COPY_CONTAINER[kind](obj)
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            # Only values are replaced, so iterating the copy while writing to it is safe
+            for k, v in _ITEMS[type(current)](current):
+                kind = type(v)
+                if kind is Decimal:
+                    current[k] = float(v) if v % 1 != 0 else int(v)
+                elif kind in _COPY_CONTAINER:
+                    current[k] = child = _COPY_CONTAINER[kind](v)
+                    stack.append(child)
+        return root
     
-    def filter_cases(self, cases: List[Dict], filters: Dict) -> List[Dict]:
-        """Filter cases based on criteria"""
+    def filter_cases(self, cases: List[Dict], filters: Dict, index: Optional[Dict] = None) -> List[Dict]:
+        """Filter cases based on criteria, using index (from build_filter_index on cases) when given"""
         filtered = cases
         
-        if filters.get('status'):
-            filtered = [c for c in filtered if c.get('status') in filters['status']]
-        
-        if filters.get('document_type'):
-            filtered = [c for c in filtered if c.get('documentType') in filters['document_type']]
-        
-        if filters.get('priority'):
-            filtered = [c for c in filtered if c.get('priority') in filters['priority']]
+        selected = [(attribute, filters[filter_key]) for filter_key, attribute in _FILTER_ATTRIBUTES
+                    if filters.get(filter_key)]
+        if selected and index is not None:
+            # Intersect the matching index buckets; sorting positions keeps the input order
+            positions = None
+            for attribute, values in selected:
+                buckets, unhashable = index[attribute]
+                matches = set().union(*(buckets.get(value, ()) for value in values))
+                matches.update(p for p in unhashable if cases[p].get(attribute) in values)
+                positions = matches if positions is None else positions & matches
+            filtered = [cases[position] for position in sorted(positions)]
+        else:
+            for attribute, values in selected:
+                filtered = [c for c in filtered if c.get(attribute) in values]
         
         if filters.get('search_term'):
             search_term = filters['search_term'].lower()
@@ -60,37 +249,75 @@ class CaseManager:
         
         return filtered
     
+    def build_filter_index(self, cases: List[Dict]) -> Dict[str, Tuple[Dict[Any, set], set]]:
+        """Inverted index of case positions by filter attribute, for repeated filter_cases calls on one list"""
+        index = {attribute: (defaultdict(set), set()) for _, attribute in _FILTER_ATTRIBUTES}
+        for position, case in enumerate(cases):
+            for attribute, (buckets, unhashable) in index.items():
+                try:
+                    buckets[case.get(attribute)].add(position)
+                except TypeError:
+                    # List/map values can't be bucketed; filter_cases compares them directly
+                    unhashable.add(position)
+        return index
+    
     def _case_matches_search(self, case: Dict, search_term: str) -> bool:
         """Check if case matches search term"""
-        search_fields = ['patientName', 'fileName', 'documentType', 'caseSummary', 'diagnosisDescription']
-        return any(search_term in str(case.get(field, '')).lower() for field in search_fields)
+        lowercased = case.get('_lc')
+        if lowercased is None:
+            # Not stored on the case, which may be shared with other readers
+            lowercased = {field: str(case.get(field, '')).lower() for field in SEARCH_FIELDS}
+        for field in SEARCH_FIELDS:
+            if search_term in lowercased[field]:
+                return True
+        return False
     
-    def update_case_status(self, case_id: str, new_status: str) -> bool:
-        """Update case status in DynamoDB"""
+    def update_case_status(self, case_id: str, new_status: str) -> Optional[Dict[str, Any]]:
+        """Update case status in DynamoDB and return the updated case, or None on failure"""
         try:
             table = self.aws_client.get_table(self.table_name)
-            table.update_item(
+            response = table.update_item(
                 Key={'caseID': case_id},
                 UpdateExpression='SET #status = :new_status',
+                ConditionExpression='attribute_exists(caseID)',
                 ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={':new_status': new_status}
+                ExpressionAttributeValues={':new_status': new_status},
+                ReturnValues='ALL_NEW'
             )
             logger.info(f"Case {case_id} updated to {new_status}")
-            return True
+            self._converted.pop(case_id, None)
+            updated = response.get('Attributes') or {'caseID': case_id, 'status': new_status}
+            return self._convert_decimals(updated)
         except Exception as e:
             logger.error(f"Error updating case {case_id}: {str(e)}")
-            return False
+            return None
+    
+    def update_case_statuses(self, updates: List[Tuple[str, str]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Update several case statuses concurrently.
+        
+        Returns {caseID: updated case, or None if that update failed}. Updates
+        are independent; a failed update does not roll back the others.
+        """
+        futures = {_executor.submit(self.update_case_status, case_id, new_status): case_id
+                   for case_id, new_status in updates}
+        return {futures[future]: future.result() for future in as_completed(futures)}
     
     def get_case_metrics(self, cases: List[Dict]) -> Dict:
         """Calculate case metrics"""
-        total_cases = len(cases)
-        pending_cases = len([c for c in cases if c.get('status') == 'PENDING_REVIEW'])
-        high_priority = len([c for c in cases if c.get('priority') == 'HIGH'])
-        approved_cases = len([c for c in cases if c.get('status') == 'APPROVED'])
+        # One pass with plain counters; no intermediate lists or frames
+        pending = high = approved = 0
+        for case in cases:
+            status = case.get('status')
+            if status == 'PENDING_REVIEW':
+                pending += 1
+            elif status == 'APPROVED':
+                approved += 1
+            if case.get('priority') == 'HIGH':
+                high += 1
         
         return {
-            'total_cases': total_cases,
-            'pending_cases': pending_cases,
-            'high_priority': high_priority,
-            'approved_cases': approved_cases
+            'total_cases': len(cases),
+            'pending_cases': pending,
+            'high_priority': high,
+            'approved_cases': approved
         }
\ No newline at end of file
@@ -1,39 +1,71 @@
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-from typing import List, Dict
+from __future__ import annotations
 
-def create_status_pie_chart(cases: List[Dict]) -> go.Figure:
-    """Create pie chart of case status distribution"""
-    if not cases:
+from typing import TYPE_CHECKING, List, Dict
+
+# plotly/pandas are imported inside the functions so importing this module is cheap
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objects as go
+
+# (cases list, its length, frame) for the last list passed to build_case_frame
+_frame_cache = None
+
+def build_case_frame(cases: List[Dict]) -> pd.DataFrame:
+    """Build the chart columns of cases in one pass, reused while the same list is charted"""
+    global _frame_cache
+    cached = _frame_cache
+    if cached is not None and cached[0] is cases and cached[1] == len(cases):
+        return cached[2]
+    
+    import pandas as pd
+    
+    df = pd.DataFrame(cases, columns=['status', 'documentType', 'priority'])
+    df = df.fillna({'status': 'UNKNOWN', 'documentType': 'unknown'})
+    _frame_cache = (cases, len(cases), df)
+    return df
+
+def clear_case_frame_cache():
+    """Drop the cached frame after cases in a charted list are changed in place"""
+    global _frame_cache
+    _frame_cache = None
+
+def create_status_pie_chart(df: pd.DataFrame) -> go.Figure:
+    """Create pie chart of case status distribution from build_case_frame output"""
+    import plotly.express as px
+    
+    if df.empty:
         return create_empty_chart("No data available")
     
-    status_counts = pd.DataFrame([c.get('status', 'UNKNOWN') for c in cases]).value_counts().reset_index()
-    status_counts.columns = ['Status', 'Count']
+    status_counts = df['status'].value_counts()
     
-    fig = px.pie(status_counts, values='Count', names='Status', 
+    fig = px.pie(values=status_counts.values, names=status_counts.index,
+                 labels={'names': 'Status', 'values': 'Count'},
                  title="Case Status Distribution",
                  color_discrete_sequence=px.colors.qualitative.Set3)
     fig.update_traces(textposition='inside', textinfo='percent+label')
     return fig
 
-def create_document_type_bar_chart(cases: List[Dict]) -> go.Figure:
-    """Create bar chart of document types"""
-    if not cases:
+def create_document_type_bar_chart(df: pd.DataFrame) -> go.Figure:
+    """Create bar chart of document types from build_case_frame output"""
+    import plotly.express as px
+    
+    if df.empty:
         return create_empty_chart("No data available")
     
-    doc_type_counts = pd.DataFrame([c.get('documentType', 'unknown') for c in cases]).value_counts().reset_index()
-    doc_type_counts.columns = ['DocumentType', 'Count']
+    doc_type_counts = df['documentType'].value_counts()
     
-    fig = px.bar(doc_type_counts, x='DocumentType', y='Count',
+    fig = px.bar(x=doc_type_counts.index, y=doc_type_counts.values,
                  title="Document Type Distribution",
-                 color='DocumentType', 
+                 color=doc_type_counts.index,
+                 labels={'x': 'DocumentType', 'y': 'Count', 'color': 'DocumentType'},
                  color_discrete_sequence=px.colors.qualitative.Pastel)
     fig.update_layout(xaxis_title="Document Type", yaxis_title="Count")
     return fig
 
 def create_confidence_gauge(confidence_score: float) -> go.Figure:
     """Create confidence score gauge"""
+    import plotly.graph_objects as go
+    
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
         value=confidence_score * 100,
@@ -59,6 +91,8 @@ def create_confidence_gauge(confidence_score: float) -> go.Figure:
 
 def create_empty_chart(message: str) -> go.Figure:
     """Create an empty chart with message"""
+    import plotly.graph_objects as go
+    
     fig = go.Figure()
     fig.add_annotation(text=message, xref="paper", yref="paper",
                       x=0.5, y=0.5, xanchor='center', yanchor='middle',
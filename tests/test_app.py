@@ -1,6 +1,9 @@
 import pytest
 import sys
 import os
+import io
+from decimal import Decimal
+from types import SimpleNamespace
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -8,12 +11,15 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 from utils.case_utils import CaseManager
 
 class MockAWSClient:
-    """Mock AWS client for testing"""
+    """Mock AWS client for testing, serving table (a MockTable by default)"""
+    def __init__(self, table=None):
+        self.table = table if table is not None else MockTable()
+    
     def get_table(self, table_name):
-        return MockTable()
+        return self.table
 
 class MockTable:
-    def scan(self):
+    def scan(self, **kwargs):
         return {'Items': []}
     
     def update_item(self, **kwargs):
@@ -39,6 +45,296 @@ def test_filter_cases():
     filtered = manager.filter_cases(test_cases, {'status': ['PENDING_REVIEW']})
     assert len(filtered) == 1
     assert filtered[0]['status'] == 'PENDING_REVIEW'
+    
+    # Test search term filter
+    filtered = manager.filter_cases(test_cases, {'search_term': 'CLINICAL'})
+    assert [c['documentType'] for c in filtered] == ['clinical-note']
+    # Searching leaves the (possibly shared) cases untouched
+    assert all('_lc' not in c for c in test_cases)
+
+def test_filter_cases_with_index():
+    """Test indexed filtering keeps order and matches the linear scan"""
+    manager = CaseManager(MockAWSClient())
+    
+    test_cases = [
+        {'status': 'PENDING_REVIEW', 'documentType': 'pre-auth', 'priority': 'HIGH'},
+        {'status': 'APPROVED', 'documentType': 'clinical-note', 'priority': 'MEDIUM'},
+        {'status': 'PENDING_REVIEW', 'documentType': 'referral', 'priority': 'MEDIUM'},
+        # List/map values can't be indexed and are compared directly
+        {'status': ['PENDING_REVIEW'], 'priority': {'level': 'HIGH'}},
+    ]
+    index = manager.build_filter_index(test_cases)
+    
+    filtered = manager.filter_cases(test_cases, {'priority': ['HIGH', 'MEDIUM'], 'document_type': ['pre-auth', 'referral']}, index=index)
+    assert filtered == [test_cases[0], test_cases[2]]
+    
+    filtered = manager.filter_cases(test_cases, {'status': ['PENDING_REVIEW']}, index=index)
+    assert filtered == [test_cases[0], test_cases[2]]
+    
+    for filters in ({'status': ['APPROVED', 'PENDING_REVIEW']}, {'priority': ['MEDIUM'], 'search_term': 'REFERRAL'}):
+        assert manager.filter_cases(test_cases, filters, index=index) == manager.filter_cases(test_cases, filters)
+
+def test_get_case_metrics():
+    """Test case metrics counts"""
+    manager = CaseManager(MockAWSClient())
+    
+    test_cases = [
+        {'status': 'PENDING_REVIEW', 'priority': 'HIGH'},
+        {'status': 'PENDING_REVIEW', 'priority': 'LOW'},
+        {'status': 'APPROVED', 'priority': 'HIGH'},
+        {'documentType': 'referral'},
+    ]
+    
+    assert manager.get_case_metrics(test_cases) == {
+        'total_cases': 4,
+        'pending_cases': 2,
+        'high_priority': 2,
+        'approved_cases': 1
+    }
+    assert manager.get_case_metrics([])['total_cases'] == 0
+
+def test_get_all_cases_scans_every_segment():
+    """Test parallel scan follows pagination in every segment"""
+    class PagedTable(MockTable):
+        def scan(self, **kwargs):
+            segment = kwargs['Segment']
+            if 'ExclusiveStartKey' not in kwargs:
+                return {'Items': [{'caseID': f'{segment}-a'}], 'LastEvaluatedKey': {'caseID': f'{segment}-a'}}
+            return {'Items': [{'caseID': f'{segment}-b', 'confidenceScore': Decimal('0.5')}]}
+    
+    manager = CaseManager(MockAWSClient(PagedTable()))
+    cases = manager.get_all_cases()
+    
+    assert len(cases) == manager.scan_segments * 2
+    assert {c['caseID'] for c in cases} == {f'{s}-{p}' for s in range(manager.scan_segments) for p in 'ab'}
+    assert all(c['confidenceScore'] == 0.5 for c in cases if 'confidenceScore' in c)
+    
+    # Unchanged items reuse the previous conversion
+    assert manager.get_all_cases()[1] is cases[1]
+
+def test_get_all_cases_raises_errors_on_request():
+    """Test scan errors give an empty list unless raise_errors is set"""
+    class FailingTable(MockTable):
+        def scan(self, **kwargs):
+            raise Exception('ProvisionedThroughputExceededException')
+    
+    manager = CaseManager(MockAWSClient(FailingTable()))
+    assert manager.get_all_cases() == []
+    with pytest.raises(Exception, match='ProvisionedThroughputExceeded'):
+        manager.get_all_cases(raise_errors=True)
+
+def test_get_all_cases_pushes_filters_to_scan():
+    """Test filters become a scan FilterExpression/ProjectionExpression"""
+    class FilteringTable(MockTable):
+        def scan(self, **kwargs):
+            assert 'FilterExpression' in kwargs
+            assert 'status' in kwargs['ExpressionAttributeNames'].values()
+            return {'Items': [{'caseID': 'C1', 'patientName': 'Ann Lee'}, {'caseID': 'C2', 'patientName': 'Bo Chan'}]}
+    
+    manager = CaseManager(MockAWSClient(FilteringTable()))
+    manager.scan_segments = 1
+    cases = manager.get_all_cases({'status': ['PENDING_REVIEW'], 'search_term': 'ann'})
+    
+    assert [c['caseID'] for c in cases] == ['C1']
+
+def test_update_case_status_returns_updated_case():
+    """Test status update returns the converted ALL_NEW attributes"""
+    class UpdatingTable(MockTable):
+        def update_item(self, **kwargs):
+            assert kwargs['ReturnValues'] == 'ALL_NEW'
+            return {'Attributes': {'caseID': 'C1', 'status': 'APPROVED', 'confidenceScore': Decimal('0.9'),
+                                   'icd10Codes': {'E11.9'}, 'extractionMetadata': {'pages': Decimal('2')}}}
+    
+    manager = CaseManager(MockAWSClient(UpdatingTable()))
+    updated = manager.update_case_status('C1', 'APPROVED')
+    
+    assert updated == {'caseID': 'C1', 'status': 'APPROVED', 'confidenceScore': 0.9,
+                       'icd10Codes': ['E11.9'], 'extractionMetadata': {'pages': 2}}
+
+def test_get_filtered_cases_queries_status_index():
+    """Test filtered cases come from paged status index queries"""
+    class IndexedTable(MockTable):
+        def query(self, **kwargs):
+            assert kwargs['IndexName'] == 'status-index'
+            assert 'FilterExpression' in kwargs
+            if 'ExclusiveStartKey' in kwargs:
+                return {'Items': [{'caseID': 'C2', 'status': 'PENDING_REVIEW'}]}
+            return {'Items': [{'caseID': 'C1', 'status': 'PENDING_REVIEW'}], 'LastEvaluatedKey': {'caseID': 'C1'}}
+    
+    manager = CaseManager(MockAWSClient(IndexedTable()))
+    filters = {'status': ['PENDING_REVIEW'], 'priority': ['HIGH']}
+    
+    def no_fallback():
+        raise AssertionError('fallback loaded while the index query works')
+    
+    cases, next_keys = manager.get_filtered_cases(filters, limit=1, fallback_cases=no_fallback)
+    assert [c['caseID'] for c in cases] == ['C1']
+    assert next_keys == {'PENDING_REVIEW': {'caseID': 'C1'}}
+    
+    cases, next_keys = manager.get_filtered_cases(filters, limit=1, start_keys=next_keys)
+    assert [c['caseID'] for c in cases] == ['C2']
+    assert next_keys is None
+    
+    # A page emptied by the FilterExpression keeps reading until it has items
+    class FilteredOutTable(MockTable):
+        def query(self, **kwargs):
+            if 'ExclusiveStartKey' in kwargs:
+                return {'Items': [{'caseID': 'C3', 'status': 'PENDING_REVIEW'}]}
+            return {'Items': [], 'LastEvaluatedKey': {'caseID': 'C2'}}
+    
+    cases, next_keys = CaseManager(MockAWSClient(FilteredOutTable())).get_filtered_cases(filters, limit=1)
+    assert [c['caseID'] for c in cases] == ['C3'] and next_keys is None
+    
+    # Without the index, filtering falls back to the given cases
+    fallback = [{'status': 'PENDING_REVIEW', 'priority': 'HIGH'}, {'status': 'APPROVED', 'priority': 'HIGH'}]
+    cases, next_keys = CaseManager(MockAWSClient()).get_filtered_cases(filters, fallback_cases=lambda: fallback)
+    assert cases == fallback[:1] and next_keys is None
+
+def test_update_case_statuses_reports_each_case():
+    """Test bulk status updates return a result per case"""
+    class BulkTable(MockTable):
+        def update_item(self, **kwargs):
+            case_id = kwargs['Key']['caseID']
+            if case_id == 'missing':
+                raise Exception('ConditionalCheckFailedException')
+            return {'Attributes': {'caseID': case_id, 'status': kwargs['ExpressionAttributeValues'][':new_status']}}
+    
+    manager = CaseManager(MockAWSClient(BulkTable()))
+    results = manager.update_case_statuses([('C1', 'APPROVED'), ('C2', 'DENIED'), ('missing', 'APPROVED')])
+    
+    assert results == {
+        'C1': {'caseID': 'C1', 'status': 'APPROVED'},
+        'C2': {'caseID': 'C2', 'status': 'DENIED'},
+        'missing': None
+    }
+
+class MockS3Client:
+    """Stub S3 client recording presign calls; every call raises while fail is set"""
+    def __init__(self):
+        self.fail = False
+        self.presigned = []
+    
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        self.presigned.append(Params['Key'])
+        if self.fail:
+            raise Exception('ExpiredToken')
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?n={len(self.presigned)}"
+    
+    def get_object(self, Bucket, Key):
+        if self.fail:
+            raise Exception('NoSuchKey')
+        return {'Body': io.BytesIO(b'hello')}
+    
+    def download_file(self, bucket, key, filename, Config=None):
+        if self.fail:
+            raise Exception('NoSuchKey')
+        with open(filename, 'wb') as f:
+            f.write(b'hello')
+
+def _stub_aws_client(s3, tmpdir=None):
+    from aws_client import AWSClient
+    
+    client = AWSClient()
+    client.get_s3_client = lambda: s3
+    if tmpdir is not None:
+        client._tmpdir = str(tmpdir)
+    return client
+
+def test_parse_s3():
+    """Test S3 URIs split into bucket and key, with or without the s3:// prefix"""
+    from aws_client import AWSClient
+    
+    assert AWSClient._parse_s3('s3://bucket/docs/scan 1.pdf') == ('bucket', 'docs/scan 1.pdf')
+    assert AWSClient._parse_s3('bucket/key.txt') == ('bucket', 'key.txt')
+    for invalid in ('s3://bucket', 's3://bucket/', 'bucket', ''):
+        with pytest.raises(ValueError):
+            AWSClient._parse_s3(invalid)
+
+def test_get_document_url_reuses_presigned_urls(monkeypatch):
+    """Test presigned URLs are reused for half their lifetime and failures are not cached"""
+    import aws_client
+    
+    now = [1000.0]
+    monkeypatch.setattr(aws_client, 'time', SimpleNamespace(time=lambda: now[0]))
+    s3 = MockS3Client()
+    client = _stub_aws_client(s3)
+    
+    url = client.get_document_url('s3://bucket/docs/a.pdf')
+    assert client.get_document_url('s3://bucket/docs/a.pdf') == url
+    assert s3.presigned == ['docs/a.pdf']
+    
+    # Half of the default hour later a new URL is signed
+    now[0] += 1800
+    assert client.get_document_url('s3://bucket/docs/a.pdf') not in (url, None)
+    assert len(s3.presigned) == 2
+    
+    s3.fail = True
+    assert client.get_document_url('s3://bucket/docs/b.pdf') is None
+    s3.fail = False
+    assert client.get_document_url('s3://bucket/docs/b.pdf') is not None
+    assert client.get_document_url('not-an-s3-uri') is None
+
+def test_download_document_uses_unique_temp_files(tmp_path, monkeypatch):
+    """Test downloads of keys sharing a basename don't collide and failures leave no file"""
+    import aws_client
+    
+    monkeypatch.setattr(aws_client, '_transfer_config', lambda: None)
+    s3 = MockS3Client()
+    client = _stub_aws_client(s3, tmp_path)
+    
+    first = client.download_document('s3://bucket/a/report.pdf')
+    second = client.download_document('s3://bucket/b/report.pdf')
+    assert first != second
+    assert first.endswith('.pdf') and second.endswith('.pdf')
+    with open(first, 'rb') as f:
+        assert f.read() == b'hello'
+    
+    s3.fail = True
+    assert client.download_document('s3://bucket/c/report.pdf') is None
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in (first, second))
+
+def test_download_document_bytes():
+    """Test in-memory downloads return the object body, or None on failure"""
+    s3 = MockS3Client()
+    client = _stub_aws_client(s3)
+    
+    assert client.download_document_bytes('s3://bucket/notes/a.txt') == b'hello'
+    s3.fail = True
+    assert client.download_document_bytes('s3://bucket/notes/a.txt') is None
+
+def test_linearize_pdf_writes_linearized_copy(tmp_path):
+    """Test PDFs are rewritten as linearized temp copies"""
+    pikepdf = pytest.importorskip('pikepdf')
+    from aws_client import AWSClient
+    
+    source = tmp_path / 'scan.pdf'
+    with pikepdf.new() as pdf:
+        pdf.add_blank_page()
+        pdf.add_blank_page()
+        pdf.save(source)
+    
+    client = AWSClient()
+    client._tmpdir = str(tmp_path)
+    linearized = client._linearize_pdf(str(source))
+    
+    assert linearized != str(source) and linearized.endswith('.pdf')
+    with pikepdf.open(linearized) as pdf:
+        assert pdf.is_linearized
+        assert len(pdf.pages) == 2
+    
+    # A PDF that fails to load leaves no temp file behind
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'not a pdf')
+    with pytest.raises(Exception):
+        client._linearize_pdf(str(broken))
+    assert sorted(os.listdir(tmp_path)) == sorted(['scan.pdf', 'broken.pdf', os.path.basename(linearized)])
+
+def test_linearize_pdf_without_pikepdf(tmp_path, monkeypatch):
+    """Test PDFs are uploaded unchanged when pikepdf is not installed"""
+    from aws_client import AWSClient
+    
+    monkeypatch.setitem(sys.modules, 'pikepdf', None)
+    assert AWSClient()._linearize_pdf(str(tmp_path / 'scan.pdf')) == str(tmp_path / 'scan.pdf')
 
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file